@@ -14,35 +14,37 @@ from silicontraffic.monitor import GlobalMonitor, MovementsMonitor
 
 sumocfg_path = os.path.join(data_dir, "sumo/MoST/most.sumocfg")
 
+num_steps = 3600
+min_phase_duration = 30
+
 # create engine
 engine = SiliconSumoEngine(sumocfg_path, use_gui=False)
 
 # create data monitors
-global_monitor = GlobalMonitor()
+global_monitor = GlobalMonitor(queue_sample_every=None) # sample the queue length once per action (per engine.step call)
 movements_monitor = MovementsMonitor()
 
 # # attach monitors to engine
 global_monitor.attach_to(engine)
 movements_monitor.attach_to(engine)
 
+# the traffic lights and their numbers of phases do not change during simulation, collect them once
+traffic_light_ids = [traffic_light.id for traffic_light in engine.road_net.traffic_lights]
+num_phases = [len(traffic_light.phases) for traffic_light in engine.road_net.traffic_lights]
+
 def choose_phases():
     # this is a random example of phase determination
     return {
-        traffic_light.id: random.randint(0, len(traffic_light.phases) - 1)
-        for traffic_light in engine.road_net.traffic_lights
+        traffic_light_id: random.randrange(num_phases[i])
+        for i, traffic_light_id in enumerate(traffic_light_ids)
     }
 
-num_steps = 3600
-min_phase_duration = 30
-
 # perform one simple episode
 engine.reset()
 start_time = time.time()
 for step in tqdm(range(int(num_steps / min_phase_duration)), desc="Simulating"):
     actions = choose_phases()
-
-    for traffic_light_id, phase_index in actions.items():
-        engine.set_traffic_light_phase(traffic_light_id, phase_index)
+    engine.set_traffic_light_phases(actions)
 
     engine.step(step_num=min_phase_duration)
 
@@ -11,23 +11,42 @@ class TrafficEngine(ABC):
         - `road_net` attribute, to ensure convenient access to road net structure info.
         - `get_time` method, to get the current simulation time.
         - `get_lane_vehicle_ids` method, to get the IDs of vehicles on a lane.
+        - `get_lane_vehicle_ids_by_id` / `get_lane_vehicle_ids_by_lane` methods, typed variants of `get_lane_vehicle_ids`.
         - `get_vehicle_info` method, to get the information of a vehicle.
+        - `get_vehicles_info` method, to get the information of multiple vehicles at once.
+        - `get_vehicle_speed` method, to get the speed of a vehicle.
+        - `get_vehicle_lane_position` method, to get the position of a vehicle along its lane.
+        - `get_all_vehicle_info` method, to get the information of all running vehicles at once.
         - `get_traffic_light_phase` method, to get the phase of a traffic light.
         - `set_traffic_light_phase` method, to set the phase of a traffic light.
+        - `set_traffic_light_phases` method, to set the phases of multiple traffic lights at once.
     
     ### Note that `TrafficEnvEngine` instances only provide basic traffic data retrieval methods, for advanced statistics, see `silicontraffic.monitor` module
+
+    ### Subclass contract:
+        - implement `_reset` (not `reset`), `reset` calls it and then runs the reset handlers (see `on_reset`).
+        - a subclass that still overrides `reset` (and not `_reset`) keeps working, its `reset` is used as `_reset`.
     """
 
     road_net: RoadNet
     """`TrafficEnvEngine` instances should provide `road_net` attribute, to ensure convenient access to road net structure info."""
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # subclasses written against the former contract override `reset` itself, wrap it so that the reset handlers still run
+        if 'reset' in cls.__dict__ and '_reset' not in cls.__dict__:
+            cls._reset = cls.__dict__['reset']
+            cls.reset = TrafficEngine.reset
+
     def __init__(self):
         self.step_handlers: List[Callable[['TrafficEngine'], None]] = []
+        self.batch_step_handlers: List[Callable[['TrafficEngine'], None]] = []
+        self.reset_handlers: List[Callable[['TrafficEngine'], None]] = []
 
     @abstractmethod
-    def reset(self):
+    def _reset(self):
         """
-        Reset the traffic environment to its initial state.
+        Reset the traffic environment to its initial state. Called by `reset`, which then calls the reset handlers.
         """
         pass
 
@@ -81,6 +100,30 @@ class TrafficEngine(ABC):
         """
         pass
 
+    def get_lane_vehicle_ids_by_id(self, lane_id: str) -> list[str]:
+        """
+        Get the IDs of vehicles on a lane, given the lane ID. Engines can override this as a fast path without type dispatch.
+
+        Args:
+            lane_id (str): The ID of the lane.
+
+        Returns:
+            list[str]: The IDs of vehicles on the lane.
+        """
+        return self.get_lane_vehicle_ids(lane_id)
+
+    def get_lane_vehicle_ids_by_lane(self, lane: Lane) -> list[str]:
+        """
+        Get the IDs of vehicles on a lane, given the `Lane` object.
+
+        Args:
+            lane (Lane): The lane to get the vehicle IDs for.
+
+        Returns:
+            list[str]: The IDs of vehicles on the lane.
+        """
+        return self.get_lane_vehicle_ids_by_id(lane.id)
+
     @abstractmethod
     def get_vehicle_info(self, vehicle_id) -> Vehicle:
         """
@@ -94,6 +137,53 @@ class TrafficEngine(ABC):
         """
         pass
 
+    def get_vehicles_info(self, vehicle_ids: list[str]) -> list[Vehicle]:
+        """
+        Get the information of multiple vehicles at once.
+
+        Args:
+            vehicle_ids (list[str]): The IDs of the vehicles.
+
+        Returns:
+            list[Vehicle]: The information of the vehicles, in the same order as `vehicle_ids`.
+        """
+        return [self.get_vehicle_info(vehicle_id) for vehicle_id in vehicle_ids]
+
+    def get_vehicle_speed(self, vehicle_id: str) -> float:
+        """
+        Get the speed of a vehicle.
+
+        Args:
+            vehicle_id (str): The ID of the vehicle.
+
+        Returns:
+            float: The speed of the vehicle.
+        """
+        return self.get_vehicle_info(vehicle_id).speed
+
+    def get_vehicle_lane_position(self, vehicle_id: str) -> float:
+        """
+        Get the distance a vehicle has traveled along its current lane.
+
+        Args:
+            vehicle_id (str): The ID of the vehicle.
+
+        Returns:
+            float: The lane position of the vehicle.
+        """
+        return self.get_vehicle_info(vehicle_id).lane_position
+
+    def get_all_vehicle_info(self) -> dict[str, Vehicle]:
+        """
+        Get the information of all running vehicles in the traffic environment.
+
+        Engines that already hold a per-step snapshot of vehicle states should override this to return it directly.
+
+        Returns:
+            dict[str, Vehicle]: The information of all running vehicles, keyed by vehicle ID.
+        """
+        return {vehicle_id: self.get_vehicle_info(vehicle_id) for vehicle_id in self.get_vehicle_ids()}
+
     @abstractmethod
     def get_traffic_light_phase(self, traffic_light: Union[str, TrafficLight]) -> TrafficLightPhase:
         """
@@ -138,21 +228,46 @@ class TrafficEngine(ABC):
         """
         pass
 
+    def set_traffic_light_phases(self, phases: dict[str, Union[int, TrafficLightPhase]]):
+        """
+        Set the phases of multiple traffic lights at once.
+
+        Args:
+            phases (dict[str, Union[int, TrafficLightPhase]]): The phases to set, keyed by traffic light ID. Each phase can be either the phase index or the `TrafficLightPhase` object.
+        """
+        for traffic_light_id, phase in phases.items():
+            self.set_traffic_light_phase(traffic_light_id, phase)
+
+    def reset(self):
+        """
+        Reset the traffic environment to its initial state, then call the reset handlers (see `on_reset`).
+        """
+        self._reset()
+        for handler in self.reset_handlers:
+            handler(self)
 
     def step(self, step_num: int = 1):
         """
         Perform multiple simulation steps.
 
+        Step handlers (see `on_step`) are called after every simulated step, batch step handlers (see `on_batch_step`) once after the last one.
+
         Args:
             step_num (int, optional): The number of steps to simulate. Defaults to 1.
         """
         if len(self.step_handlers) > 0:
+            # resolve the handlers and the step method once, not at every simulated step
+            step_handlers = tuple(self.step_handlers)
+            simulation_step = self._simulation_step
             for _ in range(step_num):
-                self._simulation_step()
-                for handler in self.step_handlers:
+                simulation_step()
+                for handler in step_handlers:
                     handler(self)
         else:
             self._simulation_step(step_num) # be more efficient when no step handlers registered
+
+        for handler in self.batch_step_handlers:
+            handler(self)
     
     def on_step(self, handler: Callable[['TrafficEngine'], None]):
         """
@@ -176,6 +291,45 @@ class TrafficEngine(ABC):
         self.step_handlers.append(handler)
         return handler
 
+    def on_batch_step(self, handler: Callable[['TrafficEngine'], None]):
+        """
+        Register a batch step handler function, called once at the end of each `step` call, no matter how many steps are simulated.
+
+        Handlers that only need the state after the last simulated step should be registered here rather than with `on_step`,
+        so that `step(step_num)` can simulate all steps at once when no per-step handlers are registered.
+
+        Args:
+            handler (Callable[['TrafficEnvEngine'], None]): The batch step handler function to register.
+        
+        Examples:
+        ```
+            @my_env.on_batch_step
+            def my_batch_step_handler(traffic_env_engine: TrafficEnvEngine):
+                # do something with traffic_env_engine
+                pass
+        ```
+        """
+        self.batch_step_handlers.append(handler)
+        return handler
+
+    def on_reset(self, handler: Callable[['TrafficEngine'], None]):
+        """
+        Register a reset handler function, called at the end of each `reset` call.
+
+        Args:
+            handler (Callable[['TrafficEnvEngine'], None]): The reset handler function to register.
+        
+        Examples:
+        ```
+            @my_env.on_reset
+            def my_reset_handler(traffic_env_engine: TrafficEnvEngine):
+                # do something with traffic_env_engine
+                pass
+        ```
+        """
+        self.reset_handlers.append(handler)
+        return handler
+
     def get_lane_queue_length(self, lane: Union[str, Lane], speed_threshold: float = 0.1) -> int:
         """
         Get the queue length of a lane.
@@ -190,7 +344,6 @@ class TrafficEngine(ABC):
         vehicle_ids = self.get_lane_vehicle_ids(lane)
         queue_length = 0
         for vehicle_id in vehicle_ids:
-            vehicle = self.get_vehicle_info(vehicle_id)
-            if vehicle.speed < speed_threshold:
+            if self.get_vehicle_speed(vehicle_id) < speed_threshold:
                 queue_length += 1
         return queue_length
\ No newline at end of file
@@ -28,11 +28,7 @@ class Monitor(ABC):
             raise RuntimeError("Auto reset is already setup. Are you attaching the monitor to multiple engines? Or mistakenly setup auto reset multiple times?")
 
         self._auto_reset = True
-        self._auto_reset_prev_recorded_time = None
 
-        @engine.on_step
+        @engine.on_reset
         def _reset_monitor(_: TrafficEngine):
-            curr_time = engine.get_time()
-            if self._auto_reset_prev_recorded_time is not None and curr_time < self._auto_reset_prev_recorded_time: # reset when time is smaller than the last recorded time
-                self.reset()
-            self._auto_reset_prev_recorded_time = curr_time
+            self.reset()
@@ -1,3 +1,6 @@
+from collections import defaultdict
+from typing import Optional
+
 have_traci = True
 try:
     import traci
@@ -21,25 +24,44 @@ class GlobalMonitor(Monitor):
         - get_avg_travel_time: float
         - get_avg_stop_count: float
         - get_avg_queue_length: float
+
+    Args:
+        queue_sample_every (Optional[int]): Sample the queue length once every `queue_sample_every` simulation steps,
+            so its granularity is `queue_sample_every * dt`. If None, sample it once per `engine.step` call instead
+            (i.e. once per action, after its last simulated step). Vehicle based stats are still updated at every step.
     """
-    def __init__(self):
+    def __init__(self, queue_sample_every: Optional[int] = 1):
         super().__init__()
+        if queue_sample_every is not None and queue_sample_every < 1:
+            raise ValueError(f"queue_sample_every must be a positive integer or None, got {queue_sample_every}")
+        self._queue_sample_every = queue_sample_every
 
     def attach_to(self, engine: TrafficEngine):
         self.engine = engine
         self.setup_auto_reset(engine)
-        self.engine.on_step(lambda _: self._on_step())
+        self.engine.on_step(self._on_step) # registered as a bound method, the handler receives the engine directly
+        if self._queue_sample_every is None:
+            self.engine.on_batch_step(self._on_batch_step) # queue length is only sampled after the last step of each call
 
-        self._vehicle_waiting_time: dict[str, float] = {} # vehicle id -> accumulative waiting time
-        self._vehicle_stop: dict[str, int] = {} # vehicle id -> accumulative times of stop
+        self._lane_ids = frozenset(engine.road_net.lane_bank) # ids of lanes taken into account for queue length
+        self._num_lanes = len(self._lane_ids)
+        self._inv_num_lanes = 1.0 / self._num_lanes if self._num_lanes > 0 else 0.0 # turns the per-step average into a multiplication
 
-        self._vehicle_is_waiting: dict[str, bool] = {} # vehicle id -> whether is waiting now
+        # only vehicles that have waited / stopped get an entry here, the others count as 0
+        self._vehicle_waiting_time: defaultdict[str, float] = defaultdict(float) # vehicle id -> accumulative waiting time
+        self._vehicle_stop: defaultdict[str, int] = defaultdict(int) # vehicle id -> accumulative times of stop
+
+        self._vehicle_is_waiting: dict[str, bool] = {} # vehicle id -> whether is waiting now (every recorded vehicle has an entry)
 
         self._vehicle_depart_time: dict[str, float] = {} # vehicle id -> depart time
         self._vehicle_arrive_time: dict[str, float] = {} # vehicle id -> arrive time
-        self._vehicle_travel_time_list: list[float] = []
-        self._global_avg_queue_length: list[float] = [] # average queue length of all lanes (at each step)
+        # running sums and counts, so that memory does not grow with the number of steps / vehicles
+        self._sum_travel_time = 0.0 # sum of travel times of arrived vehicles
+        self._num_travel_time = 0 # number of travel times recorded
+        self._sum_global_avg_queue_length = 0.0 # sum of average queue lengths of all lanes (over steps)
+        self._num_global_avg_queue_length = 0 # number of steps recorded
         self._throughput = 0 # number of vehicles that arrive
+        self._tick_counter = 0 # number of steps seen, gates the queue length sampling
     
     def reset(self):
         self._vehicle_waiting_time.clear()
@@ -47,100 +69,109 @@ class GlobalMonitor(Monitor):
         self._vehicle_is_waiting.clear()
         self._vehicle_depart_time.clear()
         self._vehicle_arrive_time.clear()
-        self._vehicle_travel_time_list.clear()
-        self._global_avg_queue_length.clear()
+        self._sum_travel_time = 0.0
+        self._num_travel_time = 0
+        self._sum_global_avg_queue_length = 0.0
+        self._num_global_avg_queue_length = 0
         self._throughput = 0 # number of vehicles that arrive
+        self._tick_counter = 0
     
-    def _on_step(self):
-        curr_time = self.engine.get_time()
+    def _on_step(self, engine: TrafficEngine):
+        curr_time = engine.get_time()
+
+        self._tick_counter += 1
+        # whether queue length is sampled at this step (if sampled per call, see self._on_batch_step())
+        sample_queue = self._queue_sample_every is not None and self._tick_counter % self._queue_sample_every == 0
         
         # vehicle based stats
-        departed_vehicle_ids = self.engine.get_last_step_departed_vehicle_ids()
-        arrived_vehicle_ids = self.engine.get_last_step_arrived_vehicle_ids()
+        departed_vehicle_ids = engine.get_last_step_departed_vehicle_ids()
+        arrived_vehicle_ids = engine.get_last_step_arrived_vehicle_ids()
         self._throughput += len(arrived_vehicle_ids)
         
-        all_vehicle_ids = self.engine.get_vehicle_ids()
+        # read the states of all running vehicles in one call, instead of querying them one by one
+        all_vehicle_info = engine.get_all_vehicle_info()
+        sum_queue_length = 0 # number of halting vehicles on road net lanes
 
-        for vehicle_id in all_vehicle_ids:
+        # bind the per-vehicle records to locals, so the loop below does no attribute lookups per vehicle
+        vehicle_waiting_time = self._vehicle_waiting_time
+        vehicle_stop = self._vehicle_stop
+        vehicle_is_waiting = self._vehicle_is_waiting
+        lane_ids = self._lane_ids
 
-            vehicle = self.engine.get_vehicle_info(vehicle_id)
+        # update vehicle stats and count lane queues in the same pass
+        for vehicle_id, vehicle in all_vehicle_info.items():
+            waiting = vehicle.speed < 0.1
 
-            if vehicle_id not in self._vehicle_waiting_time:
-                self._vehicle_waiting_time[vehicle_id] = 0.0
+            was_waiting = vehicle_is_waiting.get(vehicle_id) # None for a vehicle seen for the first time
             
-            if vehicle_id not in self._vehicle_stop:
-                self._vehicle_stop[vehicle_id] = 0
-            
-            if vehicle_id not in self._vehicle_is_waiting:
-                self._vehicle_is_waiting[vehicle_id] = (vehicle.speed < 0.1)
-            
-            if vehicle.speed < 0.1:
-                self._vehicle_waiting_time[vehicle_id] += 1 # record waiting time
-                if not self._vehicle_is_waiting[vehicle_id]: # record the start of one stop
-                    self._vehicle_stop[vehicle_id] += 1
-                self._vehicle_is_waiting[vehicle_id] = True
-            else:
-                self._vehicle_is_waiting[vehicle_id] = False
+            if waiting:
+                vehicle_waiting_time[vehicle_id] += 1 # record waiting time
+                if not was_waiting: # skipped for vehicles that were already waiting
+                    if was_waiting is not None: # record the start of one stop (not counted if already waiting when first seen)
+                        vehicle_stop[vehicle_id] += 1
+                    vehicle_is_waiting[vehicle_id] = True
+                # only occupied lanes are visited, the others have a queue length of 0
+                # vehicles on lanes outside the road net (e.g. junction internal lanes) are not counted
+                if sample_queue and vehicle.drivable_id in lane_ids:
+                    sum_queue_length += 1
+            elif was_waiting is not False:
+                vehicle_is_waiting[vehicle_id] = False
 
         for vehicle_id in departed_vehicle_ids:
-            # if vehicle_id in self._vehicle_depart_time:
-            #     print(f"Vehicle {vehicle_id} departs more than once!")
-            #     breakpoint()
             self._vehicle_depart_time[vehicle_id] = curr_time # record vehicle depart time
 
         for vehicle_id in arrived_vehicle_ids:
             if vehicle_id not in self._vehicle_depart_time:
                 raise ValueError(f"Vehicle {vehicle_id} arrives before departure!")
-            self._vehicle_travel_time_list.append(curr_time - self._vehicle_depart_time[vehicle_id])
+            self._sum_travel_time += curr_time - self._vehicle_depart_time[vehicle_id]
+            self._num_travel_time += 1
             self._vehicle_depart_time.pop(vehicle_id)
             # self._vehicle_arrive_time[vehicle_id] = curr_time # record vehicle arrive time
 
         # lane based stats
-        sum_queue_length = sum([self.engine.get_lane_queue_length(lane) for lane in self.engine.road_net.lanes])
-        avg_queue_length = sum_queue_length / len(self.engine.road_net.lanes) if len(self.engine.road_net.lanes) > 0 else 0.0
-        self._global_avg_queue_length.append(avg_queue_length)
+        if sample_queue:
+            self._record_queue_length(sum_queue_length)
+
+    def _on_batch_step(self, engine: TrafficEngine):
+        lane_ids = self._lane_ids
+        # same count as in self._on_step(): halting vehicles on road net lanes
+        sum_queue_length = sum(
+            1 for vehicle in engine.get_all_vehicle_info().values()
+            if vehicle.speed < 0.1 and vehicle.drivable_id in lane_ids
+        )
+        self._record_queue_length(sum_queue_length)
+
+    def _record_queue_length(self, sum_queue_length: int):
+        avg_queue_length = sum_queue_length * self._inv_num_lanes
+        self._sum_global_avg_queue_length += avg_queue_length
+        self._num_global_avg_queue_length += 1
 
     def get_avg_waiting_time(self) -> float:
         """
         return the average waiting time of all recorded vehicles
         """
-        return sum(self._vehicle_waiting_time.values()) / len(self._vehicle_waiting_time) if len(self._vehicle_waiting_time) > 0 else 0.0
+        return sum(self._vehicle_waiting_time.values()) / len(self._vehicle_is_waiting) if len(self._vehicle_is_waiting) > 0 else 0.0
     
     def get_avg_stop_times(self) -> float:
         """
         return the average times of stop of all recorded vehicles
         """
-        return sum(self._vehicle_stop.values()) / len(self._vehicle_stop) if len(self._vehicle_stop) > 0 else 0.0
+        return sum(self._vehicle_stop.values()) / len(self._vehicle_is_waiting) if len(self._vehicle_is_waiting) > 0 else 0.0
 
     def get_avg_travel_time(self) -> float:
         """
         return the average travel time of all recorded vehicles (not including the vehicles that never arrive)
         """
-        sum_travel_time = 0.0
-        effective_vehicle_num = 0
-
-        # curr_time = self.engine.get_time()
-
-        # for vehicle_id in self._vehicle_depart_time:
-        #     if vehicle_id in self._vehicle_arrive_time:
-        #         sum_travel_time += self._vehicle_arrive_time[vehicle_id] - self._vehicle_depart_time[vehicle_id]
-        #         effective_vehicle_num += 1
-        #     else:
-        #         sum_travel_time += curr_time - self._vehicle_depart_time[vehicle_id]
-        #         effective_vehicle_num += 1
-        
-        # return sum_travel_time / effective_vehicle_num if effective_vehicle_num > 0 else 0.0
-
-        if len(self._vehicle_travel_time_list) == 0:
+        if self._num_travel_time == 0:
             return 0
         else:
-            return sum(self._vehicle_travel_time_list) / len(self._vehicle_travel_time_list)
+            return self._sum_travel_time / self._num_travel_time
 
     def get_avg_queue_length(self) -> float:
         """
         return the average queue length of all lanes
         """
-        return sum(self._global_avg_queue_length) / len(self._global_avg_queue_length) if len(self._global_avg_queue_length) > 0 else 0.0
+        return self._sum_global_avg_queue_length / self._num_global_avg_queue_length if self._num_global_avg_queue_length > 0 else 0.0
 
     def get_throughput(self) -> int:
         """
@@ -1,7 +1,9 @@
 from .abstract_monitor import Monitor
 from ..abstract_traffic_env_engine import TrafficEngine
 from ..movement_modeling import Movement, MovementRoadNet
+from ..road_net import Lane
 
+from statistics import fmean
 from typing import Union
 
 class MovementsMonitor(Monitor):
@@ -13,71 +15,114 @@ class MovementsMonitor(Monitor):
 
     def attach_to(self, engine: TrafficEngine):
         self.engine = engine
-        # self.setup_auto_reset(engine)
+        self.setup_auto_reset(engine)
 
         try:
             self.road_net = MovementRoadNet(engine.road_net)
         except Exception as e:
             raise ValueError("Failed to create MovementRoadNet from engine.road_net") from e
+
+        # movement queue lengths computed at the current simulation time, shared by all queries until the time changes
+        self._tick_cache: dict[str, int] = {} # movement id -> sum queue length
+        self._tick_lane_state: dict[str, tuple[int, list[str]]] = {} # lane id -> (queue length, vehicle ids)
+        self._tick_cache_time: float = None # simulation time the caches were filled at
         
     def reset(self):
-        pass
+        self._tick_cache.clear()
+        self._tick_lane_state.clear()
+        self._tick_cache_time = None
+
+    def _get_tick_cache(self) -> dict[str, int]:
+        """
+        return the per-tick cache, cleared (together with the lane states) whenever the simulation time has changed since it was filled
+        """
+        curr_time = self.engine.get_time()
+        if curr_time != self._tick_cache_time:
+            self._tick_cache.clear()
+            self._tick_lane_state.clear()
+            self._tick_cache_time = curr_time
+        return self._tick_cache
+
+    def _get_lane_state(self, lane: Lane) -> tuple[int, list[str]]:
+        """
+        return (queue length, vehicle ids) of the lane, queried from the engine once per tick (lanes are shared by movements)
+
+        call `_get_tick_cache` first, so that states from a previous tick are dropped
+        """
+        lane_state = self._tick_lane_state.get(lane.id)
+        if lane_state is None:
+            lane_state = (self.engine.get_lane_queue_length(lane), self.engine.get_lane_vehicle_ids_by_lane(lane))
+            self._tick_lane_state[lane.id] = lane_state
+        return lane_state
     
     def get_movement_sum_queue_length(self, movement: Union[Movement, str]) -> int:
         if isinstance(movement, str):
             movement = self.road_net.movement_bank.get(movement)
         assert movement is not None, f"Movement {movement} not found in engine.road_net"
+
+        tick_cache = self._get_tick_cache()
+        if movement.id in tick_cache:
+            return tick_cache[movement.id]
         
+        # bind what the per-vehicle loops below need to locals
+        from_edge_id = movement.from_edge.id
+        to_edge_id = movement.to_edge.id
+        get_vehicle_lane_position = self.engine.get_vehicle_lane_position
+
         sum_queue_length = 0
         for lane in movement.from_lanes:
-            num_movements = len(self.road_net.get_movements_by_lane(lane)) # num of movements from this lane
-            vehicle_ids = self.engine.get_lane_vehicle_ids(lane)
-            lane_queue_length = self.engine.get_lane_queue_length(lane)
+            lane_queue_length, vehicle_ids = self._get_lane_state(lane)
 
             if lane_queue_length == 0:
-                continue
+                continue # nothing to attribute, skip the lookups below
+
+            num_movements = len(self.road_net.get_movements_by_lane(lane)) # num of movements from this lane
 
             if num_movements == 1:
                 sum_queue_length += lane_queue_length
 
             else: # num_movements > 1    
-                vehicles = [self.engine.get_vehicle_info(vehicle_id) for vehicle_id in vehicle_ids]
-
-                first_vehicle = max(vehicles, key=lambda v: v.lane_position) # first vehicle in the queue
-
-                if movement.from_edge.id not in first_vehicle.route:
+                # first vehicle in the queue (the one with the biggest lane_position), found in a single pass over positions
+                first_vehicle_id = None
+                first_vehicle_position = float('-inf')
+                for vehicle_id in vehicle_ids:
+                    lane_position = get_vehicle_lane_position(vehicle_id)
+                    if lane_position > first_vehicle_position:
+                        first_vehicle_id = vehicle_id
+                        first_vehicle_position = lane_position
+                first_vehicle = self.engine.get_vehicle_info(first_vehicle_id)
+
+                curr_edge_index = first_vehicle.route_index.get(from_edge_id)
+                if curr_edge_index is None:
                     raise ValueError(f"Vehicle {first_vehicle.id} not in the movement's route")
 
-                curr_edge_index = first_vehicle.route.index(movement.from_edge.id)
-
                 if curr_edge_index == len(first_vehicle.route) - 1:
                     # raise IndexError(f"Vehicle {first_vehicle.id} is on the last edge in the route")
 
                     first_vehicle = None
                     curr_edge_index = None
 
-                    sorted_vehicles = sorted(vehicles, key=lambda v: -v.lane_position) # the first vehicle in the queue is the one with the biggest lane_position
-                    sorted_vehicles = sorted_vehicles[1:]
-                    if len(sorted_vehicles) == 0:
-                        continue
-                    for vehicle in sorted_vehicles:
-                        if movement.from_edge.id not in vehicle.route:
-                            raise ValueError(f"Vehicle {first_vehicle.id} not in the movement's route")
-                        
-                        curr_edge_index = vehicle.route.index(movement.from_edge.id)
-
-                        if curr_edge_index < len(vehicle.route) - 1:
-                            # effective first vehicle
+                    # effective first vehicle: the one with the biggest lane_position among those that have a next edge, found in a single pass
+                    first_vehicle_position = float('-inf')
+                    for vehicle in self.engine.get_vehicles_info(vehicle_ids):
+                        vehicle_edge_index = vehicle.route_index.get(from_edge_id)
+                        if vehicle_edge_index is None:
+                            raise ValueError(f"Vehicle {vehicle.id} not in the movement's route")
+
+                        if vehicle_edge_index < len(vehicle.route) - 1 and vehicle.lane_position > first_vehicle_position:
                             first_vehicle = vehicle
-                            break
+                            first_vehicle_position = vehicle.lane_position
+                            curr_edge_index = vehicle_edge_index
 
                 if first_vehicle is None:
                     continue
 
                 next_edge_id = first_vehicle.route[curr_edge_index + 1]
 
-                if next_edge_id == movement.to_edge.id:
+                if next_edge_id == to_edge_id:
                     sum_queue_length += lane_queue_length
+
+        tick_cache[movement.id] = sum_queue_length
         return sum_queue_length
     
     def get_movement_avg_queue_length(self, movement: Union[Movement, str]) -> float:
@@ -86,47 +131,59 @@ class MovementsMonitor(Monitor):
         assert movement is not None, f"Movement {movement} not found in engine.road_net"
         
         sum_queue_length = self.get_movement_sum_queue_length(movement)
-        return sum_queue_length / len(movement.from_lanes)
+        return sum_queue_length / movement.num_from_lanes if movement.num_from_lanes > 0 else 0.0
     
     def get_movement_max_lane_length(self, movement: Union[Movement, str]) -> float:
         if isinstance(movement, str):
             movement = self.road_net.movement_bank.get(movement)
         assert movement is not None, f"Movement {movement} not found in engine.road_net"
         
-        return max([lane.length for lane in movement.from_lanes])
+        return movement.max_lane_length
     
     def get_movement_effective_vehicles(self, movement: Union[Movement, str], effective_range: float = 100) -> int:
         if isinstance(movement, str):
             movement = self.road_net.movement_bank.get(movement)
         assert movement is not None, f"Movement {movement} not found in engine.road_net"
         
-        list_lane_effective_vehicles = []
+        sum_effective_vehicles = 0
         for lane in movement.from_lanes:
             # TODO: check movement demand
-            lane_effective_vehicles = 0
-            vehicle_ids = self.engine.get_lane_vehicle_ids(lane)
-            for vehicle_id in vehicle_ids:
-                vehicle = self.engine.get_vehicle_info(vehicle_id)
-                if lane.length - vehicle.lane_position > effective_range:
-                    continue
-                lane_effective_vehicles += 1
-            list_lane_effective_vehicles.append(lane_effective_vehicles)
+            vehicles = self.engine.get_vehicles_info(self.engine.get_lane_vehicle_ids_by_lane(lane))
+            min_lane_position = lane.length - effective_range # vehicles closer to the lane end than effective_range are effective
+            sum_effective_vehicles += sum(1 for vehicle in vehicles if vehicle.lane_position >= min_lane_position)
 
-        movement_effective_vehicles = sum(list_lane_effective_vehicles) / len(movement.from_lanes) if len(movement.from_lanes) > 0 else 0
+        movement_effective_vehicles = sum_effective_vehicles / movement.num_from_lanes if movement.num_from_lanes > 0 else 0
         return movement_effective_vehicles
 
     def get_movement_efficient_pressure(self, movement: Union[Movement, str]) -> float:
         if isinstance(movement, str):
-            movement = self.road_net.get_movement(movement)
+            movement = self.road_net.movement_bank.get(movement)
         assert movement is not None, f"Movement {movement} not found in engine.road_net"
         
         upstream_avg_queue_length = self.get_movement_avg_queue_length(movement)
 
-        list_downstream_avg_queue_length = []
-        for downstream_movement in self.road_net.get_downstream_movements(movement):
-            list_downstream_avg_queue_length.append(self.get_movement_avg_queue_length(downstream_movement))
-        downstream_avg_queue_length = sum(list_downstream_avg_queue_length) / len(self.road_net.get_downstream_movements(movement)) \
-            if len(self.road_net.get_downstream_movements(movement)) > 0 else 0
+        downstream_movements = self.road_net.get_downstream_movements(movement)
+        downstream_avg_queue_length = fmean(map(self.get_movement_avg_queue_length, downstream_movements)) if downstream_movements else 0
         
         pressure = upstream_avg_queue_length - downstream_avg_queue_length
         return pressure
+
+    def get_all_movement_metrics(self, effective_range: float = 100) -> dict[str, dict[str, float]]:
+        """
+        Get the metrics of all movements in the road net at once.
+
+        Args:
+            effective_range (float, optional): The effective range used for `get_movement_effective_vehicles`. Defaults to 100.
+
+        Returns:
+            dict[str, dict[str, float]]: movement id -> {"avg_queue_length", "efficient_pressure", "effective_vehicles"}
+        """
+        # movements share their queue lengths through the per-tick cache, so each one is computed only once here
+        metrics: dict[str, dict[str, float]] = {}
+        for movement in self.road_net.movement_bank.values():
+            metrics[movement.id] = {
+                "avg_queue_length": self.get_movement_avg_queue_length(movement),
+                "efficient_pressure": self.get_movement_efficient_pressure(movement),
+                "effective_vehicles": self.get_movement_effective_vehicles(movement, effective_range),
+            }
+        return metrics
@@ -1,17 +1,31 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from ..road_net import *
 
-@dataclass
+@dataclass(slots=True)
 class Movement:
     from_edge: Edge
     to_edge: Edge
     from_lanes: list[Lane]
     traffic_light: Optional[TrafficLight] = None
     """ The traffic light that controls this movement. None if this movement is not controlled by a traffic light. """
+    id: str = field(init=False)
+    key: tuple[str, str] = field(init=False, repr=False, compare=False)
+    """ (from_edge_id, to_edge_id), hashed without building the id string """
+    num_from_lanes: int = field(init=False, repr=False, compare=False)
+    max_lane_length: float = field(init=False, repr=False, compare=False)
+    """ The length of the longest from_lane. """
 
     def __post_init__(self):
+        self.key = (self.from_edge.id, self.to_edge.id)
         self.id = f'{self.from_edge.id}_{self.to_edge.id}'
+        # from_lanes do not change after construction
+        self.num_from_lanes = len(self.from_lanes)
+        self.max_lane_length = max((lane.length for lane in self.from_lanes), default=0.0)
+
+    def __hash__(self) -> int:
+        # a from-edge and a to-edge have at most one movement linking them, so the id identifies a movement
+        return hash(self.id)
     
     def __repr__(self) -> str:
         return f'Movement(from_edge={self.from_edge.id}, to_edge={self.to_edge.id}, num_from_lanes={len(self.from_lanes)})'
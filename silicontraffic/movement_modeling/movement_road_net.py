@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from ..road_net import *
 from .movement import Movement
 
@@ -20,65 +22,98 @@ class MovementRoadNet(RoadNet):
         """
 
         movement_bank: dict[str, Movement] = {} # movement_id -> movement
-        lane_movement_map: dict[str, list[Movement]] = {} # lane_id -> [movement]
-        from_edge_movement_map: dict[str, list[Movement]] = {} # from_edge_id -> [movement]
+        edge_pair_movement_map: dict[tuple[str, str], Movement] = {} # (from_edge_id, to_edge_id) -> movement
+        lane_movement_map: defaultdict[str, list[Movement]] = defaultdict(list) # lane_id -> [movement]
+        from_edge_movement_map: defaultdict[str, list[Movement]] = defaultdict(list) # from_edge_id -> [movement]
+        to_edge_movement_map: defaultdict[str, list[Movement]] = defaultdict(list) # to_edge_id -> [movement]
         traffic_light_movement_map: dict[str, list[Movement]] = {} # traffic_light_id -> [movement]
         phase_movement_map: dict[str, list[Movement]] = {} # phase_id -> [movement]
 
         for edge in self.edges:
 
-            edge_lane_map: dict[str, list[Lane]] = {} # to_edge_id -> [from_lane]
+            edge_lane_map: defaultdict[str, list[Lane]] = defaultdict(list) # to_edge_id -> [from_lane]
 
             for lane in edge.lanes:
                 for link in lane.links:
-                    to_edge_id = link.to_lane.parent_edge.id
-                    if to_edge_id not in edge_lane_map:
-                        edge_lane_map[to_edge_id] = []
-                    edge_lane_map[to_edge_id].append(lane)
+                    edge_lane_map[link.to_lane.parent_edge.id].append(lane)
             
             for to_edge_id, from_lanes in edge_lane_map.items():
                 # create movement
                 movement = Movement(edge, self.get_edge(to_edge_id), from_lanes)
                 movement_bank[movement.id] = movement
+                edge_pair_movement_map[movement.key] = movement
 
                 # add movement to lane_movement_map
                 for from_lane in from_lanes:
-                    if from_lane.id not in lane_movement_map:
-                        lane_movement_map[from_lane.id] = []
                     lane_movement_map[from_lane.id].append(movement)
 
                 # add movement to from_edge_movement_map
-                if edge.id not in from_edge_movement_map:
-                    from_edge_movement_map[edge.id] = []
                 from_edge_movement_map[edge.id].append(movement)
 
+        # add movements to to_edge_movement_map junction by junction, so that the movements ending on an edge
+        # are listed in the order of their from_edges in the in_coming_edges of the junction they cross
+        for junction in self.junctions:
+            for in_edge in junction.in_coming_edges:
+                for movement in from_edge_movement_map.get(in_edge.id, []):
+                    to_edge_movement_map[movement.to_edge.id].append(movement)
+
+        # back to plain dicts, so that looking up a missing key raises (or returns the default) instead of inserting it
+        lane_movement_map = dict(lane_movement_map)
+        from_edge_movement_map = dict(from_edge_movement_map)
+        to_edge_movement_map = dict(to_edge_movement_map)
+
         for traffic_light in self.traffic_lights:
             traffic_light_movement_map[traffic_light.id] = []
+            traffic_light_movement_ids: set[str] = set() # ids of movements already in traffic_light_movement_map, for O(1) membership tests
 
             for phase in traffic_light.phases:
                 phase_movement_map[phase.id] = []
+                phase_movement_ids: set[str] = set() # ids of movements already in phase_movement_map
 
                 for link in phase.available_links:
                     controlled_movements = lane_movement_map[link.from_lane.id]
                     for movement in controlled_movements:
                         # set parent traffic light for movement
                         movement.traffic_light = traffic_light
-                        if movement not in traffic_light_movement_map[traffic_light.id]:
+                        if movement.id not in traffic_light_movement_ids:
                             # add movement to traffic_light_movement_map
+                            traffic_light_movement_ids.add(movement.id)
                             traffic_light_movement_map[traffic_light.id].append(movement)
-                        if movement not in phase_movement_map[phase.id]:
+                        if movement.id not in phase_movement_ids:
                             # add movement to phase_movement_map
+                            phase_movement_ids.add(movement.id)
                             phase_movement_map[phase.id].append(movement)
 
         self.movement_bank = movement_bank
+        self._movements = tuple(movement_bank.values()) # movement_bank is only built here, so its values can be cached
+        self.edge_pair_movement_map = edge_pair_movement_map
         self.lane_movement_map = lane_movement_map
         self.from_edge_movement_map = from_edge_movement_map
+        self.to_edge_movement_map = to_edge_movement_map
         self.traffic_light_movement_map = traffic_light_movement_map
         self.phase_movement_map = phase_movement_map
+
+        # topology and phases do not change after this point, so the movement relations are computed once here
+        downstream_movements_map: dict[str, list[Movement]] = {} # movement_id -> [downstream movement]
+        upstream_movements_map: dict[str, list[Movement]] = {} # movement_id -> [upstream movement]
+        conflict_movements_map: dict[str, list[Movement]] = {} # movement_id -> [conflict movement]
+
+        for movement in movement_bank.values():
+            downstream_movements_map[movement.id] = self.get_movements_by_edge(movement.to_edge)
+            # movements that end on this movement's from_edge
+            upstream_movements_map[movement.id] = to_edge_movement_map.get(movement.from_edge.id, [])
+            conflict_movements_map[movement.id] = [] # movements not controlled by any traffic light have no conflicts
+
+        for traffic_light in self.traffic_lights:
+            conflict_movements_map.update(self._compute_traffic_light_conflict_movements(traffic_light))
+
+        self.downstream_movements_map = downstream_movements_map
+        self.upstream_movements_map = upstream_movements_map
+        self.conflict_movements_map = conflict_movements_map
     
     @property
-    def movements(self) -> list[Movement]:
-        return list(self.movement_bank.values())
+    def movements(self) -> tuple[Movement, ...]:
+        return self._movements
 
     def get_movement(self, from_edge: Union[Edge, str], to_edge: Union[Edge, str], default_value = None) -> Movement:
         """
@@ -95,7 +130,7 @@ class MovementRoadNet(RoadNet):
             from_edge = from_edge.id
         if isinstance(to_edge, Edge):
             to_edge = to_edge.id
-        return self.movement_bank.get(f'{from_edge}_{to_edge}', default_value)
+        return self.edge_pair_movement_map.get((from_edge, to_edge), default_value)
 
     def get_movements_by_lane(self, lane: Union[Lane, str]) -> list[Movement]:
         """
@@ -171,7 +206,7 @@ class MovementRoadNet(RoadNet):
         Returns:
             list[Movement]: The movements that pass through the given movement's to_edge.
         """
-        return self.get_movements_by_edge(movement.to_edge)
+        return self.downstream_movements_map.get(movement.id, [])
     
     
     def get_upstream_movements(self, movement: Movement) -> list[Movement]:
@@ -184,14 +219,7 @@ class MovementRoadNet(RoadNet):
         Returns:
             list[Movement]: The movements that pass through the given movement's from_edge.
         """
-        from_junction = movement.from_edge.from_junction
-        upstream_edges = from_junction.in_coming_edges
-        upstream_movements: list[Movement] = []
-        for edge in upstream_edges:
-            for other_movement in self.get_movements_by_edge(edge):
-                if other_movement.to_edge.id == movement.from_edge.id:
-                    upstream_movements.append(other_movement)
-        return upstream_movements
+        return self.upstream_movements_map.get(movement.id, [])
     
     def get_conflict_movements(self, movement: Movement) -> list[Movement]:
         """
@@ -203,25 +231,46 @@ class MovementRoadNet(RoadNet):
         Returns:
             list[Movement]: The movements that conflict with the given movement.
         """
-        if movement.traffic_light is None:
-            # movement not controlled by any traffic light
-            return []
-        
-        traffic_light = movement.traffic_light
-        
-        results: list[Movement] = []
-        for other_movement in self.get_movements_by_traffic_light(traffic_light):
-            if other_movement == movement:
-                continue
+        return self.conflict_movements_map.get(movement.id, [])
+
+    def _compute_traffic_light_conflict_movements(self, traffic_light: TrafficLight) -> dict[str, list[Movement]]:
+        """
+        Compute the conflict movements (see `get_conflict_movements`) of all movements whose traffic light is the given one.
+
+        Movements of the traffic light are encoded as bits of an int, and a phase as the mask of the movements it allows,
+        so that the movements sharing a phase with a movement are found with bitwise ops instead of membership tests.
+
+        Returns:
+            dict[str, list[Movement]]: movement_id -> [conflict movement]
+        """
+        traffic_light_movements = self.get_movements_by_traffic_light(traffic_light)
+        movement_bits: dict[str, int] = {movement.id: 1 << i for i, movement in enumerate(traffic_light_movements)} # movement_id -> bit
+        traffic_light_mask = (1 << len(traffic_light_movements)) - 1
+
+        phase_masks: list[int] = []
+        for phase in traffic_light.phases:
+            phase_mask = 0
+            for movement in self.get_allowed_movements_by_phase(phase):
+                phase_mask |= movement_bits.get(movement.id, 0)
+            phase_masks.append(phase_mask)
+
+        results: dict[str, list[Movement]] = {}
+        for movement in traffic_light_movements:
+            if movement.traffic_light is not traffic_light:
+                continue # conflicts are defined by the movement's own traffic light
+
+            movement_bit = movement_bits[movement.id]
+            shared_mask = 0 # movements allowed together with this one by at least one phase
+            for phase_mask in phase_masks:
+                if phase_mask & movement_bit:
+                    shared_mask |= phase_mask
+            conflict_mask = traffic_light_mask & ~shared_mask & ~movement_bit
+
+            conflict_movements: list[Movement] = []
+            while conflict_mask:
+                lowest_bit = conflict_mask & -conflict_mask
+                conflict_movements.append(traffic_light_movements[lowest_bit.bit_length() - 1])
+                conflict_mask ^= lowest_bit
+            results[movement.id] = conflict_movements
 
-            conflict = True
-            for phase in traffic_light.phases:
-                allowed_movements = self.get_allowed_movements_by_phase(phase)
-                if other_movement in allowed_movements and movement in allowed_movements:
-                    conflict = False
-                    break
-            
-            if conflict:
-                results.append(other_movement)
-                
         return results
@@ -1,7 +1,8 @@
 from typing import Iterable, Union
 from dataclasses import dataclass, field
 
-@dataclass
+# road net entities are created once per network element and read in every hot loop, slots keep them small and their attributes fast to access
+@dataclass(slots=True)
 class Junction:
     id: str
     position: tuple[float, float]
@@ -19,7 +20,7 @@ class Junction:
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     id: str
     from_junction: Junction
@@ -36,7 +37,7 @@ class Edge:
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class Lane:
     id: str
     parent_edge: Edge
@@ -53,29 +54,30 @@ class Lane:
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class TrafficLight:
     id: str
     controlled_links: list['LaneLink']
     phases: list['TrafficLightPhase']
-
-    def __post_init__(self):
-        self._uncontrolled_links = None
+    _uncontrolled_links: list['LaneLink'] = field(default=None, init=False, repr=False, compare=False) # computed on first access
 
     @property
     def uncontrolled_links(self) -> list['LaneLink']:
         if self._uncontrolled_links is not None:
             return self._uncontrolled_links
 
-        result = []
-        for link in self.controlled_links:
-            controlled = False
-            for phase in self.phases:
-                if link not in phase.available_links:
-                    controlled = True
-                    break
-            if not controlled:
-                result.append(link)
+        # a link is uncontrolled if every phase allows it, i.e. it is in the intersection of the phases' available links
+        always_available: set['LaneLink'] = None
+        for phase in self.phases:
+            if always_available is None:
+                always_available = set(phase.available_links)
+            else:
+                always_available.intersection_update(phase.available_links)
+
+        if always_available is None: # no phases, nothing restricts the links
+            result = list(self.controlled_links)
+        else:
+            result = [link for link in self.controlled_links if link in always_available]
 
         # for phase in self.phases:
         #     print('phase', phase.index)
@@ -91,7 +93,7 @@ class TrafficLight:
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class LaneLink:
     from_lane: Lane
     to_lane: Lane
@@ -100,18 +102,23 @@ class LaneLink:
 
     def __eq__(self, other: 'LaneLink') -> bool:
         return (self.from_lane.id == other.from_lane.id and self.to_lane.id == other.to_lane.id)
+
+    def __hash__(self) -> int:
+        # consistent with __eq__
+        return hash((self.from_lane.id, self.to_lane.id))
     
     def __repr__(self) -> str:
         return f'LaneLink(from_lane={self.from_lane.id}, to_lane={self.to_lane.id}, link_lane={self.link_lane.id}, type={self.type})'
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class TrafficLightPhase:
     index: int
     duration: float
     parent_trafficlight: TrafficLight
     available_links: list[LaneLink]
+    id: str = field(init=False)
 
     def __post_init__(self):
         self.id = f'{self.parent_trafficlight.id}_phase_{self.index}'
@@ -121,7 +128,7 @@ class TrafficLightPhase:
     def __str__(self) -> str:
         return self.__repr__()
 
-@dataclass
+@dataclass(slots=True)
 class RoadNet:
     junction_bank: dict[str, Junction] = field(default_factory=dict)
     edge_bank: dict[str, Edge] = field(default_factory=dict)
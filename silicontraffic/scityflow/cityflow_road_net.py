@@ -1,16 +1,30 @@
+have_orjson = True
+try:
+    import orjson
+except (ImportError, ModuleNotFoundError):
+    have_orjson = False
+
 import json
+import math
+from collections import defaultdict
 from typing import Literal
 from ..road_net import *
 
 def _get_road_length(points):
-    l = 0
-    for i in range(len(points) - 1):
-        l += ((points[i]['x'] - points[i+1]['x'])**2 + (points[i]['y'] - points[i+1]['y'])**2)**0.5
-    return l
+    # sum of the segment lengths between consecutive points, math.hypot does the arithmetic in C
+    return sum(
+        math.hypot(next_point['x'] - point['x'], next_point['y'] - point['y'])
+        for point, next_point in zip(points, points[1:])
+    )
 
 def load_cityflow_road_net(road_net_file_path: str) -> RoadNet:
-    with open(road_net_file_path, 'r') as f:
-        road_net_data = json.load(f)
+    if have_orjson:
+        # road net files can be several MB, orjson parses them a few times faster than the json module
+        with open(road_net_file_path, 'rb') as f:
+            road_net_data = orjson.loads(f.read())
+    else:
+        with open(road_net_file_path, 'r') as f:
+            road_net_data = json.load(f)
 
     road_net = RoadNet()
     
@@ -68,28 +82,31 @@ def load_cityflow_road_net(road_net_file_path: str) -> RoadNet:
         road.lanes = list_lanes
         road_net.edge_bank[road_id] = road
 
-    # 3. Add Roads Access To Intersections
+    # 3. Add Roads Access To Intersections And Build Traffic Light And Lane Link Data
+    # both only need the roads of 2., so they are done in a single pass over the intersections
+    edge_bank = road_net.edge_bank
+    junction_bank = road_net.junction_bank
+
     for inter_data in road_net_data['intersections']:
         inter_id = inter_data['id']
         road_ids = inter_data['roads']
+        junction = junction_bank[inter_id]
 
+        # 3.1 add roads access to the intersection
         for road_id in road_ids:
-            if road_id not in road_net.edge_bank:
+            if road_id not in edge_bank:
                 raise RuntimeError(f"Road {road_id} referenced in intersection {inter_id} not found in edge_bank.")
             
-            road = road_net.edge_bank[road_id]
+            road = edge_bank[road_id]
             if road.from_junction.id == inter_id:
-                road_net.junction_bank[inter_id].out_going_edges.append(road)
+                junction.out_going_edges.append(road)
             elif road.to_junction.id == inter_id:
-                road_net.junction_bank[inter_id].in_coming_edges.append(road)
+                junction.in_coming_edges.append(road)
             else:
                 raise RuntimeError(f"Trying to connect road {road_id} to intersection {inter_id}, but neither end matches this intersection.")
-    
-    # 4. Build Traffic Light And Lane Link Data
-    for inter_data in road_net_data['intersections']:
 
         traffic_light = TrafficLight(
-            id=inter_data['id'],
+            id=junction.id,
             controlled_links=[],
             phases=[]
         )
@@ -97,39 +114,38 @@ def load_cityflow_road_net(road_net_file_path: str) -> RoadNet:
         list_road_link_data = inter_data['roadLinks']
         traffic_light_data = inter_data['trafficLight']
 
-        # 4.1 build lane links
+        # 3.2 build lane links
         links: list[LaneLink] = []
+        road_pair_links: defaultdict[tuple[str, str], list[LaneLink]] = defaultdict(list) # (start_road_id, end_road_id) -> [link], for phase resolution in 3.3
 
         for road_link_data in list_road_link_data:
             start_road_id = road_link_data['startRoad']
             end_road_id = road_link_data['endRoad']
+            # lanes are stored in index order on their road (see 2.), so they are picked by index instead of building their ids
+            start_road_lanes = edge_bank[start_road_id].lanes
+            end_road_lanes = edge_bank[end_road_id].lanes
 
             link_type = None
             if 'type' in road_link_data:
                 link_type = road_link_data['type']
 
             for lane_link_data in road_link_data['laneLinks']:
-                start_lane_index = lane_link_data['startLaneIndex']
-                end_lane_index = lane_link_data['endLaneIndex']
-
-                start_lane_id = f'{start_road_id}_{start_lane_index}'
-                end_lane_id = f'{end_road_id}_{end_lane_index}'
-
                 link = LaneLink(
-                    from_lane=road_net.lane_bank[start_lane_id],
-                    to_lane=road_net.lane_bank[end_lane_id],
+                    from_lane=start_road_lanes[lane_link_data['startLaneIndex']],
+                    to_lane=end_road_lanes[lane_link_data['endLaneIndex']],
                     link_lane=None, # TODO: add link lane if necessary
                     type=link_type
                 )
                 links.append(link)
                 link.from_lane.links.append(link)
+                road_pair_links[(start_road_id, end_road_id)].append(link)
         
-        road_net.junction_bank[traffic_light.id].lane_links = links
+        junction.lane_links = links
         if len(traffic_light_data['roadLinkIndices']) == 0:
             # unsignalized intersection
             continue
     
-        # 4.2 create traffic light phases
+        # 3.3 create traffic light phases
         phases: list[TrafficLightPhase] = []
         road_link_indices = traffic_light_data['roadLinkIndices']
         list_phase_data = traffic_light_data['lightphases']
@@ -140,9 +156,7 @@ def load_cityflow_road_net(road_net_file_path: str) -> RoadNet:
             available_links = []
             for link_id in available_road_link_ids:
                 road_link_data = list_road_link_data[ road_link_indices[link_id] ] # TODO: Is it correct?
-                for link in links:
-                    if link.from_lane.parent_edge.id == road_link_data['startRoad'] and link.to_lane.parent_edge.id == road_link_data['endRoad']:
-                        available_links.append(link)
+                available_links.extend(road_pair_links.get((road_link_data['startRoad'], road_link_data['endRoad']), ()))
 
             phase = TrafficLightPhase(
                 index=i,
@@ -27,9 +27,11 @@ class SiliconCityFlowEngine(TrafficEngine):
         self.road_net = load_cityflow_road_net(path_to_road_net_file)
 
         self.traffic_light_ids = list(self.road_net.traffic_light_bank.keys())
+        self._traffic_light_phases: dict[str, tuple[TrafficLightPhase, ...]] = {
+            traffic_light_id: tuple(traffic_light.phases) for traffic_light_id, traffic_light in self.road_net.traffic_light_bank.items()
+        } # traffic light id -> phases, the road net does not change after loading
 
         self._cache_lane_vehicle_ids: dict[str, list[str]] = {} # lane id -> vehicle ids
-        self._cache_lane_vehicle_ids_time: int = -1
         self._cache_vehicle_info: dict[str, Vehicle] = {} # vehicle id -> vehicle
 
         self._cache_traffic_light_phase_map: dict[str, int] = {} # traffic light id -> phase index
@@ -43,11 +45,11 @@ class SiliconCityFlowEngine(TrafficEngine):
         # it seems that cityflow does not need to terminate explicitly
         pass
 
-    def reset(self):
+    def _reset(self):
         self.eng = cityflow.Engine(self.path_to_cityflow_config, thread_num = self.thread_num)
+        self._curr_time = self.eng.get_current_time() # afterwards only updated in _simulation_step
 
         self._cache_lane_vehicle_ids.clear()
-        self._cache_lane_vehicle_ids_time = -1
         self._cache_vehicle_info.clear()
         self._cache_traffic_light_phase_map.clear()
         self._prev_vehicle_ids.clear()
@@ -55,12 +57,20 @@ class SiliconCityFlowEngine(TrafficEngine):
         self._last_step_arrived_vehicle_ids.clear()
 
     def _simulation_step(self, step_num: int = 1):
-        self._cache_vehicle_info.clear()
-        self._cache_lane_vehicle_ids.clear()
         if step_num < 1:
             step_num = 1
-        for _ in range(int(step_num)):
+        step_num = int(step_num)
+        for step_index in range(step_num):
             self.eng.next_step()
+
+            # only the states after the last simulated step are readable: departed / arrived vehicles of the last step
+            # need the running vehicles of the step before it, and `Vehicle` objects are only built for the last one
+            remaining_step_num = step_num - 1 - step_index
+            if remaining_step_num > 1:
+                continue
+            build_vehicle_info = remaining_step_num == 0
+
+            self._cache_vehicle_info.clear() # drop vehicles that arrived during the previous step
             self._curr_time = self.eng.get_current_time()
 
             lane_vehicle_dict: dict[str, list[str]] = self.eng.get_lane_vehicles()
@@ -84,6 +94,11 @@ class SiliconCityFlowEngine(TrafficEngine):
                     if "running" not in info_dict or not info_dict["running"]:
                         continue
 
+                    curr_vehicle_ids.add(vehicle_id) # departed / arrived vehicles are still tracked at every step
+
+                    if not build_vehicle_info:
+                        continue
+
                     lane_position = float(info_dict["distance"])
                     speed = float(info_dict["speed"])
                     drivable_id = info_dict["drivable"]
@@ -96,8 +111,6 @@ class SiliconCityFlowEngine(TrafficEngine):
                         route=route
                     )
                     self._cache_vehicle_info[vehicle_id] = vehicle
-
-                    curr_vehicle_ids.add(vehicle_id)
             
             self._last_step_departed_vehicle_ids = curr_vehicle_ids - self._prev_vehicle_ids
             self._last_step_arrived_vehicle_ids = self._prev_vehicle_ids - curr_vehicle_ids
@@ -118,10 +131,11 @@ class SiliconCityFlowEngine(TrafficEngine):
         # it seems that cityflow does not provide a method to get traffic light phase, so we cache it
         if isinstance(traffic_light, TrafficLight):
             traffic_light = traffic_light.id
-        if traffic_light not in self.road_net.traffic_light_bank:
+        phases = self._traffic_light_phases.get(traffic_light)
+        if phases is None:
             raise ValueError(f"traffic light {traffic_light} not found")
         phase_index = self._cache_traffic_light_phase_map.get(traffic_light, 0)
-        return self.road_net.get_traffic_light(traffic_light).phases[phase_index]
+        return phases[phase_index]
 
     def get_vehicle_ids(self) -> list[str]:
         return list(self._cache_vehicle_info.keys())
@@ -129,18 +143,30 @@ class SiliconCityFlowEngine(TrafficEngine):
     def get_lane_vehicle_ids(self, lane: Union[str, Lane]) -> list[str]:
         if isinstance(lane, Lane):
             lane = lane.id
+        return self.get_lane_vehicle_ids_by_id(lane)
 
-        if lane not in self.road_net.lane_bank:
-            raise ValueError(f"lane {lane} not found")
-        if lane not in self._cache_lane_vehicle_ids:
+    def get_lane_vehicle_ids_by_id(self, lane_id: str) -> list[str]:
+        if lane_id not in self.road_net.lane_bank:
+            raise ValueError(f"lane {lane_id} not found")
+        if lane_id not in self._cache_lane_vehicle_ids:
             return []
-        return self._cache_lane_vehicle_ids[lane]
+        return self._cache_lane_vehicle_ids[lane_id]
 
     def get_vehicle_info(self, vehicle_id) -> Vehicle:
         if vehicle_id not in self._cache_vehicle_info:
             raise ValueError(f"vehicle {vehicle_id} not found")
         return self._cache_vehicle_info[vehicle_id]
     
+    def get_vehicles_info(self, vehicle_ids: list[str]) -> list[Vehicle]:
+        cache_vehicle_info = self._cache_vehicle_info
+        try:
+            return [cache_vehicle_info[vehicle_id] for vehicle_id in vehicle_ids]
+        except KeyError as e:
+            raise ValueError(f"vehicle {e.args[0]} not found") from None
+    
+    def get_all_vehicle_info(self) -> dict[str, Vehicle]:
+        return self._cache_vehicle_info
+    
     def get_last_step_departed_vehicle_ids(self) -> list[str]:
         return list(self._last_step_departed_vehicle_ids)
         
@@ -1,13 +1,12 @@
-import threading
+import itertools
 
-_port_factory = 8831
-_lock = threading.Lock()
+_FIRST_PORT = 8832
+_NUM_PORTS = 65535 - _FIRST_PORT + 1
+
+_port_counter = itertools.count() # next() on itertools.count is atomic under the GIL, no lock needed
 
 def get_unique_port():
-    global _port_factory
-    with _lock:
-        if _port_factory > 65535: # normally not possible to happen
-            print("[get_unique_port] Warning: port factory exceeds 65535, reset to 8831")
-            _port_factory = 8831
-        _port_factory += 1
-    return _port_factory
+    n = next(_port_counter)
+    if n > 0 and n % _NUM_PORTS == 0: # normally not possible to happen
+        print(f"[get_unique_port] Warning: port factory exceeds 65535, reset to {_FIRST_PORT}")
+    return _FIRST_PORT + n % _NUM_PORTS
@@ -8,12 +8,19 @@ try:
 except (ImportError, ModuleNotFoundError):
     raise ImportError("sumolib module not found. Please install sumo first.")
 
+have_libsumo = True
+try:
+    import libsumo
+except (ImportError, ModuleNotFoundError):
+    have_libsumo = False
+
 import os
 import subprocess
 import random
 import time
 import xml.etree.ElementTree as ET
 
+from collections import defaultdict
 from pathlib import Path
 from sumolib import checkBinary as check_binary
 
@@ -54,8 +61,23 @@ from ..vehicle import Vehicle
 SUMO = check_binary('sumo')
 SUMO_GUI = check_binary('sumo-gui')
 
+TRACI_CONNECT_TIMEOUT = 60 # seconds to wait for a started sumo to accept the TraCI connection
+
+TRAFFIC_LIGHT_HOLD_DURATION = 1e9 # seconds, remaining duration given to a set phase, so that sumo never switches it by itself
+
+HALTING_SPEED = 0.1 # speed under which sumo considers a vehicle as halting (same as the default queue speed threshold)
+
+VEHICLE_SUBSCRIPTION_VARS = (VAR_LANE_ID, VAR_SPEED, VAR_LANEPOSITION) # vehicle variables read from the subscription results at every step
+
+# names of the domains exposed as engine attributes, shared by traci and libsumo
+DOMAIN_NAMES = (
+    'busstop', 'calibrator', 'chargingstation', 'edge', 'gui', 'inductionloop', 'junction', 'lane',
+    'lanearea', 'meandata', 'multientryexit', 'overheadwire', 'parkingarea', 'person', 'poi', 'polygon',
+    'rerouter', 'route', 'routeprobe', 'simulation', 'trafficlight', 'variablespeedsign', 'vehicle', 'vehicletype',
+)
+
 class SiliconSumoEngine(TrafficEngine):
-    def __init__(self, sumocfg_path: str, log_path: str = "temp/", port: int = None, seed: int = None, time_to_teleport: int = 600, waiting_time_memory: int = 100, use_gui: bool = False):
+    def __init__(self, sumocfg_path: str, log_path: str = "temp/", port: int = None, seed: int = None, time_to_teleport: int = 600, waiting_time_memory: int = 100, use_gui: bool = False, use_libsumo: bool = False):
         super().__init__()
         self.sumocfg_path = sumocfg_path
 
@@ -74,6 +96,12 @@ class SiliconSumoEngine(TrafficEngine):
         self.time_to_teleport = time_to_teleport
         self.waiting_time_memory = waiting_time_memory
         self.use_gui = use_gui
+
+        # libsumo runs sumo in-process instead of over a TraCI socket, which is much faster,
+        # but it supports only one simulation per process and has no GUI
+        self.use_libsumo = use_libsumo and not use_gui
+        if self.use_libsumo and not have_libsumo:
+            raise ImportError("libsumo module not found. Please install libsumo first, or set `use_libsumo` to False.")
         
         self._connection: traci.connection.Connection = None
 
@@ -81,46 +109,55 @@ class SiliconSumoEngine(TrafficEngine):
         self.road_net: RoadNet = None
         self.update_road_net()
         self.traffic_light_ids = list(self.road_net.traffic_light_bank.keys())
+        self._traffic_light_phases: dict[str, tuple[TrafficLightPhase, ...]] = {
+            traffic_light_id: tuple(traffic_light.phases) for traffic_light_id, traffic_light in self.road_net.traffic_light_bank.items()
+        } # traffic light id -> phases, the road net does not change after loading
 
-        # Create domain instances as exposed APIs (exactly the same usage with traci)
-        self.busstop = BusStopDomain()
-        self.calibrator = CalibratorDomain()
-        self.chargingstation = ChargingStationDomain()
-        self.edge = EdgeDomain()
-        self.gui = GuiDomain()
-        self.inductionloop = InductionLoopDomain()
-        self.junction = JunctionDomain()
-        self.lane = LaneDomain()
-        self.lanearea = LaneAreaDomain()
-        self.meandata = MeanDataDomain()
-        self.multientryexit = MultiEntryExitDomain()
-        self.overheadwire = OverheadWireDomain()
-        self.parkingarea = ParkingAreaDomain()
-        self.person = PersonDomain()
-        self.poi = PoiDomain()
-        self.polygon = PolygonDomain()
-        self.rerouter = RerouterDomain()
-        self.route = RouteDomain()
-        self.routeprobe = RouteProbeDomain()
-        self.simulation = SimulationDomain()
-        self.trafficlight = TrafficLightDomain()
-        self.variablespeedsign = VariableSpeedSignDomain()
-        self.vehicle = VehicleDomain()
-        self.vehicletype = VehicleTypeDomain()
+        if self.use_libsumo:
+            # libsumo provides the same domains as modules bound to the in-process simulation, no connection needs to be set
+            for domain_name in DOMAIN_NAMES:
+                setattr(self, domain_name, getattr(libsumo, domain_name))
+        else:
+            # Create domain instances as exposed APIs (exactly the same usage with traci)
+            self.busstop = BusStopDomain()
+            self.calibrator = CalibratorDomain()
+            self.chargingstation = ChargingStationDomain()
+            self.edge = EdgeDomain()
+            self.gui = GuiDomain()
+            self.inductionloop = InductionLoopDomain()
+            self.junction = JunctionDomain()
+            self.lane = LaneDomain()
+            self.lanearea = LaneAreaDomain()
+            self.meandata = MeanDataDomain()
+            self.multientryexit = MultiEntryExitDomain()
+            self.overheadwire = OverheadWireDomain()
+            self.parkingarea = ParkingAreaDomain()
+            self.person = PersonDomain()
+            self.poi = PoiDomain()
+            self.polygon = PolygonDomain()
+            self.rerouter = RerouterDomain()
+            self.route = RouteDomain()
+            self.routeprobe = RouteProbeDomain()
+            self.simulation = SimulationDomain()
+            self.trafficlight = TrafficLightDomain()
+            self.variablespeedsign = VariableSpeedSignDomain()
+            self.vehicle = VehicleDomain()
+            self.vehicletype = VehicleTypeDomain()
 
         self._cache_lane_vehicle_ids: dict[str, list[str]] = {} # lane id -> list of vehicle ids
+        self._cache_lane_halting_number: dict[str, int] = {} # lane id -> number of vehicles with speed < HALTING_SPEED
         self._cache_vehicle_info: dict[str, Vehicle] = {} # vehicle id -> vehicle
         self._cache_vehicle_route_map: dict[str, list[str]] = {} # vehicle id -> route (list of edge ids)
         self._cache_traffic_light_phases: dict[str, int] = {} # traffic light id -> phase index
+        self._pending_traffic_light_phases: dict[str, int] = {} # traffic light id -> phase index to be sent to sumo at next step
         self._cache_time = 0.0
     
     def update_road_net(self):
         # Parse sumocfg to get net-file path
         self.net_file_path = None
-        tree = ET.parse(self.sumocfg_path)
-        root = tree.getroot()
-        for elem in root.iter():
-            if 'net-file' == elem.tag:
+        # stream the tags and stop at the first `net-file`, instead of building the whole tree
+        for _, elem in ET.iterparse(self.sumocfg_path, events=('start',)):
+            if elem.tag == 'net-file':
                 self.net_file_path = elem.get('value')
                 break
         
@@ -134,108 +171,123 @@ class SiliconSumoEngine(TrafficEngine):
             self._connection.close()
             self._connection = None
     
-    def reset(self):
-        if self._connection:
-            self.terminate()
-
+    def _reset(self):
         binary = SUMO_GUI if self.use_gui else SUMO
 
         command = [binary, '-c', self.sumocfg_path]
         command += ['--seed', str(self.seed)]
-        command += ['--remote-port', str(self.port)]
         command += ['--no-step-log', 'True']
         command += ['--time-to-teleport', str(self.time_to_teleport)]
         command += ['--no-warnings', 'True']
         command += ['--duration-log.disable', 'True']
+        command += ['--xml-validation', 'never'] # skip schema validation of the input files
         # command += ['--waiting-time-memory', str(self.waiting_time_memory)]
         command += ['--tripinfo-output', os.path.join(self.log_path, 'trip.xml')]
-        subprocess.Popen(command)
 
-        time.sleep(1) # wait for sumo to start
-
-        self._connection = traci.connect(port=self.port)
-        
-        # Set connections for domain instances, so that they can be used as exposed APIs
-        self.busstop._setConnection(self._connection)
-        self.calibrator._setConnection(self._connection)
-        self.chargingstation._setConnection(self._connection)
-        self.edge._setConnection(self._connection)
-        self.gui._setConnection(self._connection)
-        self.inductionloop._setConnection(self._connection)
-        self.junction._setConnection(self._connection)
-        self.lane._setConnection(self._connection)
-        self.lanearea._setConnection(self._connection)
-        self.meandata._setConnection(self._connection)
-        self.multientryexit._setConnection(self._connection)
-        self.overheadwire._setConnection(self._connection)
-        self.parkingarea._setConnection(self._connection)
-        self.person._setConnection(self._connection)
-        self.poi._setConnection(self._connection)
-        self.polygon._setConnection(self._connection)
-        self.rerouter._setConnection(self._connection)
-        self.route._setConnection(self._connection)
-        self.routeprobe._setConnection(self._connection)
-        self.simulation._setConnection(self._connection)
-        self.trafficlight._setConnection(self._connection)
-        self.variablespeedsign._setConnection(self._connection)
-        self.vehicle._setConnection(self._connection)
-        self.vehicletype._setConnection(self._connection)
+        if self._connection:
+            # reload the scenario in the running sumo, instead of terminating it and starting a new process
+            self._connection.load(command[1:]) # both a traci connection and the libsumo module provide `load`
+        elif self.use_libsumo:
+            libsumo.start(command)
+            self._connection = libsumo # the libsumo module provides `simulationStep` and `close`, just like a traci connection
+        else:
+            self._start_traci(command)
 
         self._cache_lane_vehicle_ids.clear()
+        self._cache_lane_halting_number.clear()
         self._cache_vehicle_info.clear()
         self._cache_vehicle_route_map.clear()
         self._cache_traffic_light_phases.clear()
+        self._pending_traffic_light_phases = dict.fromkeys(self.traffic_light_ids, 0) # all traffic lights start (and stay) in phase 0
         self._cache_time = 0.0
 
+    def _start_traci(self, command: list[str]):
+        """
+        Start a `sumo` subprocess and connect to it over TraCI.
+        """
+        command = command + ['--remote-port', str(self.port)]
+        sumo_process = subprocess.Popen(command)
+
+        # poll until sumo has opened the port, instead of always sleeping a fixed time before connecting
+        retry_interval = 0.01
+        deadline = time.time() + TRACI_CONNECT_TIMEOUT
+        while True:
+            try:
+                # a single attempt, raises TraCIException if sumo has already exited (e.g. because of a config error)
+                self._connection = traci.connect(port=self.port, numRetries=0, proc=sumo_process)
+                break
+            except traci.FatalTraCIError:
+                if time.time() > deadline:
+                    # do not leave a sumo process behind that still holds the port
+                    sumo_process.kill()
+                    sumo_process.wait()
+                    raise
+                time.sleep(retry_interval)
+                retry_interval = min(retry_interval * 1.5, 0.5)
+        
+        # Set connections for domain instances, so that they can be used as exposed APIs
+        for domain_name in DOMAIN_NAMES:
+            getattr(self, domain_name)._setConnection(self._connection)
+
     def _simulation_step(self, step_num: int = 1):
-        self._cache_lane_vehicle_ids.clear()
-        self._cache_vehicle_info.clear()
         if step_num < 1:
             step_num = 1
 
-        for _ in range(int(step_num)):
+        # set_traffic_light_phase only queues phases that differ from the current ones, and the sent phases are held
+        # by a huge remaining duration to avoid automatic phase transfer,
+        # so the traffic lights need no TraCI calls at the other steps (the phases in cache are the actual ones)
+        for traffic_light_id, phase_index in self._pending_traffic_light_phases.items():
+            self.trafficlight.setPhase(traffic_light_id, phase_index)
+            self.trafficlight.setPhaseDuration(traffic_light_id, TRAFFIC_LIGHT_HOLD_DURATION)
+        self._pending_traffic_light_phases.clear()
 
-            for traffic_light in self.road_net.traffic_lights:
-                phase_index = 0
-                if traffic_light.id in self._cache_traffic_light_phases:
-                    # to avoid automatic phase transfer, we set the light phases again according to cache
-                    phase_index = self._cache_traffic_light_phases[traffic_light.id]
-                self.trafficlight.setPhase(traffic_light.id, phase_index)
+        for _ in range(int(step_num)):
 
             self._connection.simulationStep()
             self._cache_time = self.simulation.getTime()
 
-            for traffic_light in self.road_net.traffic_lights:
-                phase_index = self.trafficlight.getPhase(traffic_light.id)
-                self._cache_traffic_light_phases[traffic_light.id] = phase_index
-
             departed_vehicle_ids = self.simulation.getDepartedIDList()
             arrived_vehicle_ids = self.simulation.getArrivedIDList()
+            # routes are fetched once at departure instead of subscribed, so that they are not sent again at every step
             for vehicle_id in departed_vehicle_ids:
-                self.vehicle.subscribe(vehicle_id, [VAR_LANE_ID, VAR_SPEED, VAR_LANEPOSITION])
+                self.vehicle.subscribe(vehicle_id, VEHICLE_SUBSCRIPTION_VARS)
                 self._cache_vehicle_route_map[vehicle_id] = self.vehicle.getRoute(vehicle_id)
-            
-            subscription_results: dict[str, dict] = self.vehicle.getAllSubscriptionResults()
-            for vehicle_id, vehicle_info in subscription_results.items():
-                lane_position = vehicle_info[VAR_LANEPOSITION]
-                speed = vehicle_info[VAR_SPEED]
-                drivable_id = vehicle_info[VAR_LANE_ID]
-                route = self._cache_vehicle_route_map.get(vehicle_id)
-
-                self._cache_vehicle_info[vehicle_id] = Vehicle(
-                    id=vehicle_id,
-                    lane_position=lane_position,
-                    speed=speed,
-                    drivable_id=drivable_id,
-                    route=route
-                )
-
-                if drivable_id not in self._cache_lane_vehicle_ids:
-                    self._cache_lane_vehicle_ids[drivable_id] = []
-                self._cache_lane_vehicle_ids[drivable_id].append(vehicle_id)
+            for vehicle_id in arrived_vehicle_ids:
+                self._cache_vehicle_route_map.pop(vehicle_id, None) # arrived vehicles are no longer in the subscription results
             
             self._cache_last_step_departed_vehicle_ids = departed_vehicle_ids
             self._cache_last_step_arrived_vehicle_ids = arrived_vehicle_ids
+
+        # vehicle states are only readable after the last step, so the snapshot is built once per call
+        self._cache_vehicle_info.clear()
+
+        # only the occupied lanes get an entry, rebuilt from scratch since they change from step to step
+        lane_vehicle_ids: defaultdict[str, list[str]] = defaultdict(list)
+        lane_halting_number: defaultdict[str, int] = defaultdict(int)
+
+        cache_vehicle_info = self._cache_vehicle_info
+        vehicle_route_map = self._cache_vehicle_route_map
+
+        subscription_results: dict[str, dict] = self.vehicle.getAllSubscriptionResults()
+        for vehicle_id, vehicle_info in subscription_results.items():
+            speed = vehicle_info[VAR_SPEED]
+            drivable_id = vehicle_info[VAR_LANE_ID]
+
+            cache_vehicle_info[vehicle_id] = Vehicle(
+                id=vehicle_id,
+                lane_position=vehicle_info[VAR_LANEPOSITION],
+                speed=speed,
+                drivable_id=drivable_id,
+                route=vehicle_route_map.get(vehicle_id)
+            )
+
+            lane_vehicle_ids[drivable_id].append(vehicle_id)
+
+            if speed < HALTING_SPEED:
+                lane_halting_number[drivable_id] += 1
+
+        self._cache_lane_vehicle_ids = lane_vehicle_ids
+        self._cache_lane_halting_number = lane_halting_number
     
     def get_time(self) -> float:
         return self._cache_time
@@ -248,14 +300,18 @@ class SiliconSumoEngine(TrafficEngine):
             traffic_light = traffic_light.id
         if isinstance(phase, TrafficLightPhase):
             phase = phase.index
+        if phase == self._cache_traffic_light_phases.get(traffic_light, 0):
+            return # already set (or about to be), and held by sumo
         self._cache_traffic_light_phases[traffic_light] = phase
+        self._pending_traffic_light_phases[traffic_light] = phase
         # the chosen phases will be set at next simulation step
         # see self._simulation_step()
     
     def get_traffic_light_phase(self, traffic_light: Union[str, TrafficLight]) -> TrafficLightPhase:
         if isinstance(traffic_light, TrafficLight):
             traffic_light = traffic_light.id
-        if traffic_light not in self.traffic_light_ids:
+        phases = self._traffic_light_phases.get(traffic_light) # dict lookup instead of a scan of traffic_light_ids
+        if phases is None:
             raise ValueError(f"traffic light {traffic_light} not found")
         # phase_index = self.trafficlight.getPhase(traffic_light)
 
@@ -264,27 +320,46 @@ class SiliconSumoEngine(TrafficEngine):
         phase_index = 0
         if traffic_light in self._cache_traffic_light_phases:
             phase_index = self._cache_traffic_light_phases[traffic_light]
-        return self.road_net.get_traffic_light(traffic_light).phases[phase_index]
+        return phases[phase_index]
     
     def get_lane_vehicle_ids(self, lane: Union[str, Lane]) -> list[str]:
+        if isinstance(lane, Lane):
+            lane = lane.id
+        return self.get_lane_vehicle_ids_by_id(lane)
+
+    def get_lane_vehicle_ids_by_id(self, lane_id: str) -> list[str]:
+        if lane_id not in self.road_net.lane_bank:
+            raise ValueError(f"lane {lane_id} not found")
+        return self._cache_lane_vehicle_ids.get(lane_id, [])
+    
+    def get_lane_queue_length(self, lane: Union[str, Lane], speed_threshold: float = HALTING_SPEED) -> int:
+        if speed_threshold != HALTING_SPEED:
+            return super().get_lane_queue_length(lane, speed_threshold)
         if isinstance(lane, Lane):
             lane = lane.id
         if lane not in self.road_net.lane_bank:
             raise ValueError(f"lane {lane} not found")
-        return self._cache_lane_vehicle_ids.get(lane, [])
+        # halting numbers are counted while building the vehicle snapshot, see self._simulation_step()
+        return self._cache_lane_halting_number.get(lane, 0)
     
     def get_vehicle_info(self, vehicle_id) -> Vehicle:
         if vehicle_id not in self._cache_vehicle_info:
             raise ValueError(f"vehicle {vehicle_id} not found")
         return self._cache_vehicle_info[vehicle_id]
     
+    def get_vehicles_info(self, vehicle_ids: list[str]) -> list[Vehicle]:
+        cache_vehicle_info = self._cache_vehicle_info
+        try:
+            return [cache_vehicle_info[vehicle_id] for vehicle_id in vehicle_ids]
+        except KeyError as e:
+            raise ValueError(f"vehicle {e.args[0]} not found") from None
+    
+    def get_all_vehicle_info(self) -> dict[str, Vehicle]:
+        # built from the batched subscription results in self._simulation_step()
+        return self._cache_vehicle_info
+    
     def get_last_step_departed_vehicle_ids(self) -> list[str]:
         return self._cache_last_step_departed_vehicle_ids
     
     def get_last_step_arrived_vehicle_ids(self) -> list[str]:
         return self._cache_last_step_arrived_vehicle_ids
-    
-    # def get_lane_queue_length(self, lane: Union[str, Lane], speed_threshold = None) -> int:
-    #     if isinstance(lane, Lane):
-    #         lane = lane.id
-    #     return self.lane.getLastStepHaltingNumber(lane)
\ No newline at end of file
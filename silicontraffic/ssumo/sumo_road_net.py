@@ -3,13 +3,29 @@ try:
 except (ImportError, ModuleNotFoundError):
     raise ImportError("sumolib module not found. Please install sumo first.")
 
+import functools
+import os
+
 from ..road_net import *
 
+SUMO_NET_CACHE_SIZE = 8 # number of (net file, mtime) parsed sumo nets kept in memory
+
+@functools.lru_cache(maxsize=SUMO_NET_CACHE_SIZE)
+def _read_sumo_net(real_path: str, mtime: float) -> sumolib.net.Net:
+    # mtime is only part of the cache key, so that a modified file is parsed again
+    # the cached net is only read from when building road nets, never modified
+    return sumolib.net.readNet(real_path, withPrograms=True)
+
 def load_sumo_road_net(path_to_road_net_file: str) -> RoadNet:
     """
     Load SUMO road net from file
+
+    Parsing a net file is the expensive part of loading, so the last `SUMO_NET_CACHE_SIZE` parsed sumo nets are cached
+    per (real path, mtime), and a file that has not been modified is not parsed again, e.g. when several engines run the same scenario.
+    The `RoadNet` is built anew from the parsed net at every call, so each caller gets its own, which it can modify.
     """
-    sumo_net: sumolib.net.Net = sumolib.net.readNet(path_to_road_net_file, withPrograms=True)
+    real_path = os.path.realpath(path_to_road_net_file)
+    sumo_net: sumolib.net.Net = _read_sumo_net(real_path, os.path.getmtime(real_path))
 
 
     junction_bank: dict[str, Junction] = {}
@@ -20,7 +36,8 @@ def load_sumo_road_net(path_to_road_net_file: str) -> RoadNet:
     nodes: list[sumolib.net.node.Node] = sumo_net.getNodes()
     for node in nodes:
         node_id = node.getID()
-        junction_bank[node_id] = Junction(node_id, node.getCoord(), shape=node.getShape())
+        # shapes are copied, sumolib returns the lists of the (cached) sumo net
+        junction_bank[node_id] = Junction(node_id, node.getCoord(), shape=list(node.getShape()))
     
     edges: list[sumolib.net.edge.Edge] = sumo_net.getEdges()
     for edge in edges:
@@ -47,7 +64,7 @@ def load_sumo_road_net(path_to_road_net_file: str) -> RoadNet:
         lanes: list[sumolib.net.lane.Lane] = edge.getLanes() # lanes of the edge
         for lane in lanes:
             lane_id = lane.getID()
-            lane_obj = Lane(lane_id, edge_obj, lane.getIndex(), length=lane.getLength(), width=lane.getWidth(), speed_limit=lane.getSpeed(), shape=lane.getShape())
+            lane_obj = Lane(lane_id, edge_obj, lane.getIndex(), length=lane.getLength(), width=lane.getWidth(), speed_limit=lane.getSpeed(), shape=list(lane.getShape()))
             lane_bank[lane_id] = lane_obj
             edge_obj.lanes.append(lane_obj)
     
@@ -60,28 +77,29 @@ def load_sumo_road_net(path_to_road_net_file: str) -> RoadNet:
             from_lane_id: str = connection.getFromLane().getID()
             to_lane_id: str = connection.getToLane().getID()
 
-            assert from_lane_id in lane_bank, f"Lane {from_lane_id} not found in lane bank"
-            assert to_lane_id in lane_bank, f"Lane {to_lane_id} not found in lane bank"
+            # one lookup per lane, the checks below test the results instead of the keys
+            from_lane_obj = lane_bank.get(from_lane_id)
+            to_lane_obj = lane_bank.get(to_lane_id)
+
+            assert from_lane_obj is not None, f"Lane {from_lane_id} not found in lane bank"
+            assert to_lane_obj is not None, f"Lane {to_lane_id} not found in lane bank"
 
-            from_lane_obj = lane_bank[from_lane_id]
-            to_lane_obj = lane_bank[to_lane_id]
             lane_link_obj = LaneLink(from_lane_obj, to_lane_obj, link_lane=None)
             from_lane_obj.links.append(lane_link_obj)
             junction_obj.lane_links.append(lane_link_obj)
     
     traffic_lights: list[sumolib.net.TLS] = sumo_net.getTrafficLights()
+    green_link_indices_cache: dict[str, list[int]] = {} # phase state -> indices of green links, states repeat across similar intersections
     for traffic_light in traffic_lights:
         traffic_light_id = traffic_light.getID()
 
         tl_connections: list[tuple[sumolib.net.lane.Lane, sumolib.net.lane.Lane, int]] = traffic_light.getConnections()
         
-        link_objs = [None for _ in range(len(tl_connections))]
+        num_links = len(tl_connections)
+        link_objs = [None] * num_links
 
-        for connection in tl_connections:
-            from_lane, to_lane, link_index = connection
-            from_lane_obj = lane_bank[from_lane.getID()]
-            to_lane_obj = lane_bank[to_lane.getID()]
-            link_objs[link_index] = LaneLink(from_lane_obj, to_lane_obj, link_lane=None) # to ensure the order of lane links
+        for from_lane, to_lane, link_index in tl_connections:
+            link_objs[link_index] = LaneLink(lane_bank[from_lane.getID()], lane_bank[to_lane.getID()], link_lane=None) # to ensure the order of lane links
 
         traffic_light_program: sumolib.net.TLSProgram = traffic_light.getPrograms()["0"] # using the default program
         traffic_light_phases: list[sumolib.net.Phase] = traffic_light_program.getPhases()
@@ -90,10 +108,12 @@ def load_sumo_road_net(path_to_road_net_file: str) -> RoadNet:
 
         for i, phase in enumerate(traffic_light_phases):
 
-            available_links = []
-            for state_char, link_obj in zip(phase.state, trafficlight_obj.controlled_links):
-                if state_char.upper() == 'G':
-                    available_links.append(link_obj)
+            # links with a green ('G' or 'g') state in this phase
+            green_link_indices = green_link_indices_cache.get(phase.state)
+            if green_link_indices is None:
+                green_link_indices = [link_index for link_index, state_char in enumerate(phase.state) if state_char in 'Gg']
+                green_link_indices_cache[phase.state] = green_link_indices
+            available_links = [link_objs[link_index] for link_index in green_link_indices if link_index < num_links] # like zip, ignore state chars without a link
 
             phase_obj = TrafficLightPhase(index=i, duration=phase.duration, parent_trafficlight=trafficlight_obj, available_links=available_links)
             trafficlight_obj.phases.append(phase_obj)
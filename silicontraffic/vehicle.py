@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(slots=True) # engines create one instance per running vehicle at every step, slots keep them small
 class Vehicle:
     id: str
 
@@ -12,6 +12,18 @@ class Vehicle:
     vehicle_type: str = None
     route: list[str] = field(default_factory=list) # a list of edge ids
 
+    _route_index: dict[str, int] = field(default=None, init=False, repr=False, compare=False) # edge id -> index in route, built on first use
+
+    @property
+    def route_index(self) -> dict[str, int]:
+        """Map from edge id to its (first) index in the route, for O(1) lookups instead of `route.index`."""
+        if self._route_index is None:
+            route_index = {}
+            for index, edge_id in enumerate(self.route or ()):
+                route_index.setdefault(edge_id, index) # keep the first occurrence, like `list.index`
+            self._route_index = route_index
+        return self._route_index
+
     def __repr__(self) -> str:
         return f'Vehicle(id={self.id}, lane_position={self.lane_position}, speed={self.speed}, drivable_id={self.drivable_id}, vehicle_type={self.vehicle_type}, route={self.route})'
     def __str__(self) -> str:
@@ -0,0 +1,15 @@
+import os
+import sys
+import types
+
+# `import silicontraffic` loads both engines (SUMO and CityFlow)
+# if one of them is not installed, register the package without running its __init__,
+# so that the engine independent modules (road_net, movement_modeling, ...) can still be tested
+try:
+    import silicontraffic
+except ImportError:
+    for name in [name for name in sys.modules if name == 'silicontraffic' or name.startswith('silicontraffic.')]:
+        sys.modules.pop(name) # drop the partially imported package
+    package = types.ModuleType('silicontraffic')
+    package.__path__ = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'silicontraffic')]
+    sys.modules['silicontraffic'] = package
@@ -0,0 +1,37 @@
+from silicontraffic.road_net import *
+from silicontraffic.movement_modeling import MovementRoadNet
+
+def _build_road_net() -> RoadNet:
+    """
+    in_edge (1 lane) -> junction -> out_edge (2 lanes), the lane of in_edge links to both lanes of out_edge (like CityFlow laneLinks)
+    """
+    start = Junction('start', (0, 0))
+    middle = Junction('middle', (100, 0))
+    end = Junction('end', (200, 0))
+
+    in_edge = Edge('in_edge', start, middle)
+    out_edge = Edge('out_edge', middle, end)
+    in_lane = Lane('in_edge_0', in_edge, 0, length=100)
+    out_lanes = [Lane(f'out_edge_{i}', out_edge, i, length=100) for i in range(2)]
+    in_edge.lanes = [in_lane]
+    out_edge.lanes = out_lanes
+
+    for out_lane in out_lanes:
+        link = LaneLink(in_lane, out_lane, link_lane=None)
+        in_lane.links.append(link)
+        middle.lane_links.append(link)
+
+    return RoadNet(
+        junction_bank={junction.id: junction for junction in (start, middle, end)},
+        edge_bank={edge.id: edge for edge in (in_edge, out_edge)},
+        lane_bank={lane.id: lane for lane in (in_lane, *out_lanes)},
+    )
+
+def test_from_lanes_listed_once_per_link():
+    road_net = MovementRoadNet(_build_road_net())
+    movement = road_net.get_movement('in_edge', 'out_edge')
+
+    # a from_lane is listed once per lane link into the to_edge
+    assert [lane.id for lane in movement.from_lanes] == ['in_edge_0', 'in_edge_0']
+    assert movement.num_from_lanes == 2
+    assert road_net.get_movements_by_lane('in_edge_0') == [movement, movement]